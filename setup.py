@@ -20,8 +20,12 @@ setup(
   install_requires=[
     'geopandas',
     'networkx',
+    'numba',
+    'numpy',
     'pysheds',
-    'rtree'
+    'rtree',
+    'scipy',
+    'shapely>=2.0'
   ],
   extras_require={
     'basemap': 'contextily',
@@ -1,9 +1,14 @@
 from collections import namedtuple
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import networkx as nx
+from numba import njit
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+import shapely
 from typing import Optional
-from shapely.geometry import LineString, MultiPoint, Point
+from shapely.geometry import MultiPoint, Point
 import warnings
 
 
@@ -40,6 +45,297 @@ def get_point_coords(pt_geom, decimals: int=None) -> tuple:
     return x, y
 
 
+@njit(cache=True)
+def dfs_tree_leaves(
+    row_ptr: np.ndarray, col_idx: np.ndarray, start: int, visited: np.ndarray
+) -> tuple:
+    '''
+    Depth-first search of a graph stored in compressed sparse row (CSR) arrays,
+    equivalent to the nodes and leaves of nx.dfs_tree
+
+    Parameters
+    ----------
+    row_ptr : np.ndarray
+        The neighbors of node i are stored in col_idx[row_ptr[i]:row_ptr[i + 1]]
+    col_idx : np.ndarray
+        Node ids of the neighbors of every node
+    start : int
+        Node id to start the search from
+    visited : np.ndarray
+        Bool array with an entry for every node, all False. Used as the search's
+        visited mask and reset to all False before returning
+
+    Returns
+    -------
+    order : np.ndarray
+        Node ids reachable from start, in depth-first order
+    leaves : np.ndarray
+        Node ids of the leaves of the depth-first search tree, in depth-first order
+    '''
+    n_nodes = len(row_ptr) - 1
+    order = np.empty(n_nodes, np.int64)
+    leaves = np.empty(n_nodes, np.int64)
+    # Stack of nodes, the position of the next edge to check and whether the node
+    # has any children in the search tree
+    stack = np.empty(n_nodes, np.int64)
+    next_edge = np.empty(n_nodes, np.int64)
+    has_child = np.empty(n_nodes, np.bool_)
+
+    visited[start] = True
+    order[0] = start
+    n_order = 1
+    n_leaves = 0
+    stack[0] = start
+    next_edge[0] = row_ptr[start]
+    has_child[0] = False
+    sp = 1
+    while sp > 0:
+        u = stack[sp - 1]
+        j = next_edge[sp - 1]
+        while j < row_ptr[u + 1] and visited[col_idx[j]]:
+            j += 1
+        if j < row_ptr[u + 1]:
+            v = col_idx[j]
+            next_edge[sp - 1] = j + 1
+            has_child[sp - 1] = True
+            visited[v] = True
+            order[n_order] = v
+            n_order += 1
+            stack[sp] = v
+            next_edge[sp] = row_ptr[v]
+            has_child[sp] = False
+            sp += 1
+        else:
+            # Leaves are finished right after they are found, so this keeps them in
+            # depth-first order
+            if not has_child[sp - 1]:
+                leaves[n_leaves] = u
+                n_leaves += 1
+            sp -= 1
+
+    for i in range(n_order):
+        visited[order[i]] = False
+    return order[:n_order], leaves[:n_leaves]
+
+
+@njit(cache=True)
+def bfs_order(
+    row_ptr: np.ndarray, col_idx: np.ndarray, starts: np.ndarray, visited: np.ndarray
+) -> np.ndarray:
+    '''
+    Breadth-first search of a graph stored in compressed sparse row (CSR) arrays from
+    multiple start nodes at once
+
+    Parameters
+    ----------
+    row_ptr : np.ndarray
+        The neighbors of node i are stored in col_idx[row_ptr[i]:row_ptr[i + 1]]
+    col_idx : np.ndarray
+        Node ids of the neighbors of every node
+    starts : np.ndarray
+        Node ids to start the search from
+    visited : np.ndarray
+        Bool array with an entry for every node, nodes already marked as visited are
+        skipped. Updated in place with every node reached by the search
+
+    Returns
+    -------
+    order : np.ndarray
+        Node ids reached by the search, in breadth-first order
+    '''
+    order = np.empty(len(row_ptr) - 1, np.int64)
+    head = 0
+    tail = 0
+    for s in starts:
+        if not visited[s]:
+            visited[s] = True
+            order[tail] = s
+            tail += 1
+
+    while head < tail:
+        u = order[head]
+        head += 1
+        for j in range(row_ptr[u], row_ptr[u + 1]):
+            v = col_idx[j]
+            if not visited[v]:
+                visited[v] = True
+                order[tail] = v
+                tail += 1
+
+    return order[:tail]
+
+
+@njit(cache=True)
+def edge_position(row_ptr: np.ndarray, col_idx: np.ndarray, u: int, v: int) -> int:
+    '''
+    Position of the edge u -> v in the compressed sparse row (CSR) arrays of a graph
+
+    Parameters
+    ----------
+    row_ptr : np.ndarray
+        The successors of node i are stored in col_idx[row_ptr[i]:row_ptr[i + 1]]
+    col_idx : np.ndarray
+        Node ids of the successors of every node
+    u : int
+        Node id the edge starts at
+    v : int
+        Node id the edge ends at
+
+    Returns
+    -------
+    position : int
+        Index of v in col_idx among the successors of u, or -1 if there is no edge
+    '''
+    for j in range(row_ptr[u], row_ptr[u + 1]):
+        if col_idx[j] == v:
+            return j
+    return -1
+
+
+@njit(cache=True)
+def dfs_upstream_edges(
+    row_ptr: np.ndarray,
+    col_idx: np.ndarray,
+    row_ptr_r: np.ndarray,
+    col_idx_r: np.ndarray,
+    start: int,
+    visited: np.ndarray,
+    remove: np.ndarray
+) -> np.ndarray:
+    '''
+    Depth-first search upstream (over the predecessors) from a flow source, marking
+    the edges that point away from the source for removal
+
+    Parameters
+    ----------
+    row_ptr, col_idx : np.ndarray
+        Successors of every node as compressed sparse row (CSR) arrays
+    row_ptr_r, col_idx_r : np.ndarray
+        Predecessors of every node as CSR arrays
+    start : int
+        Node id of the flow source
+    visited : np.ndarray
+        Bool array with an entry for every node, nodes already marked as visited are
+        not searched again. Updated in place with every node reached by the search
+    remove : np.ndarray
+        Bool array with an entry for every edge in col_idx. Updated in place, every
+        edge v -> u where u was reached from v is set to True
+
+    Returns
+    -------
+    order : np.ndarray
+        Node ids reached by the search, in depth-first order
+    '''
+    n_nodes = len(row_ptr) - 1
+    order = np.empty(n_nodes, np.int64)
+    stack = np.empty(n_nodes, np.int64)
+    next_edge = np.empty(n_nodes, np.int64)
+
+    visited[start] = True
+    order[0] = start
+    n_order = 1
+    stack[0] = start
+    next_edge[0] = row_ptr_r[start]
+    sp = 1
+    while sp > 0:
+        v = stack[sp - 1]
+        j = next_edge[sp - 1]
+        while j < row_ptr_r[v + 1] and visited[col_idx_r[j]]:
+            j += 1
+        if j < row_ptr_r[v + 1]:
+            u = col_idx_r[j]
+            next_edge[sp - 1] = j + 1
+            # Only retain edge from u -> v
+            position = edge_position(row_ptr, col_idx, v, u)
+            if position >= 0:
+                remove[position] = True
+            visited[u] = True
+            order[n_order] = u
+            n_order += 1
+            stack[sp] = u
+            next_edge[sp] = row_ptr_r[u]
+            sp += 1
+        else:
+            sp -= 1
+
+    return order[:n_order]
+
+
+@njit(cache=True)
+def bfs_upstream_edges(
+    row_ptr: np.ndarray,
+    col_idx: np.ndarray,
+    row_ptr_r: np.ndarray,
+    col_idx_r: np.ndarray,
+    starts: np.ndarray,
+    remove: np.ndarray
+) -> np.ndarray:
+    '''
+    Breadth-first search upstream (over the predecessors) from all flow sources at
+    once, marking the edges that point away from the sources for removal. Where the
+    searches meet at an edge that is still bidirectional, the edge toward the node
+    reached first by the earliest source is retained
+
+    Parameters
+    ----------
+    row_ptr, col_idx : np.ndarray
+        Successors of every node as compressed sparse row (CSR) arrays
+    row_ptr_r, col_idx_r : np.ndarray
+        Predecessors of every node as CSR arrays
+    starts : np.ndarray
+        Node ids of the flow sources, without duplicates
+    remove : np.ndarray
+        Bool array with an entry for every edge in col_idx, updated in place with the
+        edges to remove
+
+    Returns
+    -------
+    order : np.ndarray
+        Node ids reached by the search, in breadth-first order
+    '''
+    n_nodes = len(row_ptr) - 1
+    order = np.empty(n_nodes, np.int64)
+    # Rank each visited node by the source that reached it, then by visit order
+    source_rank = np.full(n_nodes, -1, np.int64)
+    visit_rank = np.empty(n_nodes, np.int64)
+    tail = 0
+    for i in range(len(starts)):
+        s = starts[i]
+        source_rank[s] = i
+        visit_rank[s] = tail
+        order[tail] = s
+        tail += 1
+
+    head = 0
+    while head < tail:
+        v = order[head]
+        head += 1
+        for j in range(row_ptr_r[v], row_ptr_r[v + 1]):
+            u = col_idx_r[j]
+            position_vu = edge_position(row_ptr, col_idx, v, u)
+            if source_rank[u] < 0:
+                # Only retain edge from u -> v
+                if position_vu >= 0:
+                    remove[position_vu] = True
+                source_rank[u] = source_rank[v]
+                visit_rank[u] = tail
+                order[tail] = u
+                tail += 1
+            elif u != v and position_vu >= 0:
+                position_uv = edge_position(row_ptr, col_idx, u, v)
+                if not remove[position_uv] and not remove[position_vu]:
+                    u_first = source_rank[u] < source_rank[v] or (
+                        source_rank[u] == source_rank[v]
+                        and visit_rank[u] < visit_rank[v]
+                    )
+                    if u_first:
+                        remove[position_uv] = True
+                    else:
+                        remove[position_vu] = True
+
+    return order[:tail]
+
+
 class Network:
     '''
     Parses through stormwater infrastructure point and line data to generate directional
@@ -52,7 +348,8 @@ class Network:
     lines : gpd.GeoDataFrame
         All the stormwater infrastructure line features within the area of interest
     G : nx.DiGraph
-        A list of all the graphs generated within the area of interest
+        A list of all the graphs generated within the area of interest, call
+        build_adjacency after editing it directly
     direction_resolved : bool
         Checks if Network is fully initialized and usable, equals True if directions of
         the edges in self.G have been resolved
@@ -100,31 +397,39 @@ class Network:
         # Explode all lines into 2-vertex segments while rounding coordinates
         self.G = nx.DiGraph()
         self.directions_resolved = False
-        all_segments = {}
-        for line in storm_lines.itertuples(name='StormLine'):
-            u_coords = line.geometry.coords[:-1]
-            v_coords = line.geometry.coords[1:]
-            # Round all coordinate values
-            u_coords = [
-                tuple(
-                    [round(x, coord_decimals), round(y, coord_decimals)]
-                ) for x, y in u_coords
-            ]
-            v_coords = [
-                tuple(
-                    [round(x, coord_decimals), round(y, coord_decimals)]
-                ) for x, y in v_coords
-            ]
-
-            segments = list(map(LineString, zip(u_coords, v_coords)))
-            all_segments[line.Index] = segments
+        self._outlet_cache = {}
+        self._adjacency_stale = True
+        # Split MultiLineStrings into parts, keeping the position of their source line
+        line_parts, part_lines = shapely.get_parts(
+            storm_lines.geometry.values, return_index=True
+        )
+        not_line = shapely.get_type_id(line_parts) != shapely.GeometryType.LINESTRING
+        if not_line.any():
+            bad_lines = storm_lines.index[np.unique(part_lines[not_line])].to_list()
+            raise ValueError(
+                'Line geometry must be LineString or MultiLineString, but lines with '
+                f'indicies {bad_lines} are not'
+            )
+
+        # Round all coordinate values in a single pass
+        line_coords = np.round(shapely.get_coordinates(line_parts), coord_decimals)
+
+        # Pair up consecutive vertices that belong to the same part of a line
+        vertex_parts = np.repeat(
+            np.arange(len(line_parts)), shapely.get_num_coordinates(line_parts)
+        )
+        same_part = vertex_parts[:-1] == vertex_parts[1:]
+        seg_coords = np.stack(
+            [line_coords[:-1][same_part], line_coords[1:][same_part]], axis=1
+        )
+        seg_lines = part_lines[vertex_parts[:-1][same_part]]
 
         # Retain all segment data with the segment's source index stored in a column
-        self.segments = gpd.GeoDataFrame()
-        for src_index, segments in all_segments.items():
-            segments = gpd.GeoDataFrame(geometry=gpd.GeoSeries(segments), crs=self.crs)
-            segments['src_index'] = src_index
-            self.segments = gpd.pd.concat([self.segments, segments], ignore_index=True)
+        self.segments = gpd.GeoDataFrame(
+            {'src_index': storm_lines.index.to_numpy()[seg_lines]},
+            geometry=shapely.linestrings(seg_coords),
+            crs=self.crs
+        )
 
         self.pts = storm_pts
         # Deal with mapping of IS_SOURCE and IS_SINK in point data
@@ -161,16 +466,51 @@ class Network:
                     'To map data to IS_SOURCE a source_type argument is required'
                 )
 
-            self.pts['IS_SINK'] = self.pts[type_column].apply(
-                lambda x: True if x in sink_types else False
-            )
-            self.pts['IS_SOURCE'] = self.pts[type_column].apply(
-                lambda x: True if x in source_types else False
-            )
+            self.pts['IS_SINK'] = self.pts[type_column].isin(sink_types)
+            self.pts['IS_SOURCE'] = self.pts[type_column].isin(source_types)
 
         # Round all point coordinate values, also converting any MultiPoints to Points
-        self.pts['geometry'] = self.pts['geometry'].apply(
-            lambda geom: Point([get_point_coords(geom, coord_decimals)])
+        pt_geoms = np.asarray(self.pts.geometry.values)
+        pt_types = shapely.get_type_id(pt_geoms)
+        is_multi = pt_types == shapely.GeometryType.MULTIPOINT
+        invalid = ~is_multi & (pt_types != shapely.GeometryType.POINT)
+        if invalid.any():
+            raise ValueError(
+                'Failed to get coords for points with indicies '
+                f'{self.pts.index[invalid].to_list()}, geometry must be Point or '
+                'MultiPoint'
+            )
+        if is_multi.any():
+            n_geoms = shapely.get_num_geometries(pt_geoms)
+            multiple = np.flatnonzero(is_multi & (n_geoms > 1))
+            if len(multiple) > 0:
+                warnings.warn(
+                    f'{len(multiple)} points have MultiPoint geometry with multiple '
+                    'point coordinates, only keeping the first for indicies: '
+                    f'{self.pts.index[multiple].to_list()}'
+                )
+            pt_geoms = shapely.get_geometry(pt_geoms, 0)
+        pt_coords = np.round(shapely.get_coordinates(pt_geoms), coord_decimals)
+        pt_x = pt_coords[:, 0]
+        pt_y = pt_coords[:, 1]
+        self.pts['geometry'] = gpd.GeoSeries(
+            shapely.points(pt_x, pt_y), index=self.pts.index, crs=self.crs
+        )
+
+        # Spatial index of the points, reused by every catchment/extent query
+        self._pts_tree = shapely.STRtree(self.pts.geometry.values)
+
+        # Lookup of point indicies by their coordinates, which are also the graph nodes
+        self._coord_to_idx = {}
+        for coords, idx in zip(
+            zip(pt_x.tolist(), pt_y.tolist()), self.pts.index.tolist()
+        ):
+            self._coord_to_idx.setdefault(coords, []).append(idx)
+
+        # namedtuple class used to convert rows of self.pts into StormPoints
+        self._StormPoint_columns = self.pts.columns.copy()
+        self._StormPoint = namedtuple(
+            'StormPoint', ['Index'] + self._StormPoint_columns.to_list(), rename=True
         )
 
 
@@ -193,13 +533,17 @@ class Network:
                 warnings.warn(
                     'to_StormPoint() got multiple points, only keeping the first'
                 )
-            pt_iter = pt.itertuples(name='StormPoint')
-            pt = next(pt_iter)
+            if pt.columns.equals(self._StormPoint_columns):
+                pt = self._StormPoint(pt.index[0], *pt.iloc[0])
+            else:
+                pt = next(pt.itertuples(name='StormPoint'))
         elif isinstance(pt, pd.Series):
             # convert to StormPoint namedtuple
-            field_names = self.pts.columns.to_list()
-            field_names.insert(0, 'Index')
-            pt = namedtuple('StormPoint', field_names)(pt.name, *pt)
+            if pt.index.equals(self._StormPoint_columns):
+                pt = self._StormPoint(pt.name, *pt)
+            else:
+                field_names = ['Index'] + pt.index.to_list()
+                pt = namedtuple('StormPoint', field_names, rename=True)(pt.name, *pt)
         else:
             assert pt.__class__.__name__ == 'StormPoint', f'Expected pt to be a ' \
                 'gpd.GeoDataFrame, pd.Series, or a StormPoint namedtuple, but got a ' \
@@ -252,27 +596,71 @@ class Network:
 
     def traverse_upstream(self, coords: tuple, visited: set) -> None:
         '''
-        Revise direction of edges via recursive depth-first search, starting from an
+        Revise direction of edges via iterative depth-first search, starting from an
         outlet then traverse the graph "upstream". Visits every node that's connected to
         the initial source node.
 
         Parameters
         ----------
         coords : tuple
-            Tuple of current (x, y) float coordinates. These coordinates are the
+            Tuple of starting (x, y) float coordinates. These coordinates are the
             name/index of the nodes in self.G
         visited : set
             Used to record which coordinates have already been visited in this search
         '''
-        v = coords
-        visited.add(v)
-        for u in self.G.predecessors(v):
-            if u not in visited:
-                # Only retain edge from u -> v
-                if self.G.has_edge(v, u):
-                    assert self.G.has_edge(u, v)
-                    self.G.remove_edge(v, u)
-                self.traverse_upstream(u, visited)
+        self.update_adjacency()
+        if coords not in self._node_ids:
+            raise nx.NetworkXError(f'The node {coords} is not in the digraph.')
+
+        visited_mask = np.zeros(self._n_nodes, dtype=bool)
+        visited_mask[[self._node_ids[c] for c in visited if c in self._node_ids]] = True
+        remove = np.zeros(len(self._col_idx), dtype=bool)
+        order = dfs_upstream_edges(
+            self._row_ptr,
+            self._col_idx,
+            self._row_ptr_r,
+            self._col_idx_r,
+            self._node_ids[coords],
+            visited_mask,
+            remove
+        )
+        visited.update(self.node_coords(order))
+        self._remove_edges(remove)
+
+
+    def _remove_edges(self, remove: np.ndarray) -> None:
+        '''
+        Remove edges selected from the arrays of build_adjacency from self.G, and drop
+        them from the arrays as well so they do not need to be rebuilt
+
+        Parameters
+        ----------
+        remove : np.ndarray
+            Bool array with an entry for every edge in self._col_idx, True for the
+            edges to remove
+        '''
+        n_nodes = self._n_nodes
+        edge_u = np.repeat(np.arange(n_nodes), np.diff(self._row_ptr))
+        self.G.remove_edges_from(zip(
+            self.node_coords(edge_u[remove]), self.node_coords(self._col_idx[remove])
+        ))
+
+        # Removing edges keeps the nodes and the order of the remaining edges of
+        # self.G, so the arrays only need the removed edges masked out
+        keep = ~remove
+        removed_keys = edge_u[remove] * n_nodes + self._col_idx[remove]
+        self._row_ptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        self._row_ptr[1:] = np.cumsum(np.bincount(edge_u[keep], minlength=n_nodes))
+        self._col_idx = self._col_idx[keep]
+
+        edge_v = np.repeat(np.arange(n_nodes), np.diff(self._row_ptr_r))
+        keep_r = ~np.isin(self._col_idx_r * n_nodes + edge_v, removed_keys)
+        self._row_ptr_r = np.zeros(n_nodes + 1, dtype=np.int64)
+        self._row_ptr_r[1:] = np.cumsum(np.bincount(edge_v[keep_r], minlength=n_nodes))
+        self._col_idx_r = self._col_idx_r[keep_r]
+
+        self._flag_cycles()
+        self._outlet_cache = {}
 
 
     def add_edges(self, direction: str, verbose: bool=False)  -> None:
@@ -292,19 +680,20 @@ class Network:
         if verbose:
             print('Adding edges...')
 
+        seg_coords = shapely.get_coordinates(self.segments.geometry.values)
+        u_coords = list(map(tuple, seg_coords[0::2].tolist()))
+        v_coords = list(map(tuple, seg_coords[1::2].tolist()))
+
         if direction == 'both' or direction == 'original':
-            self.segments['geometry'].apply(
-                lambda seg: self.G.add_edge(seg.coords[0], seg.coords[1])
-            )
+            self.G.add_edges_from(zip(u_coords, v_coords))
         elif direction == 'both' or direction == 'reverse':
-            self.segments['geometry'].apply(
-                lambda seg: self.G.add_edge(seg.coords[1], seg.coords[0])
-            )
+            self.G.add_edges_from(zip(v_coords, u_coords))
         else:
             raise ValueError(
                 f'direction "{direction}" is invalid, must be "both", "original", or '
                 '"reverse"'
             )
+        self._adjacency_stale = True
 
         if verbose:
             if direction == 'original' or direction == 'reverse':
@@ -313,8 +702,10 @@ class Network:
 
     def resolve_from_sources(self, verbose: bool=False) -> None:
         '''
-        Resolve directions of all edges within the graph by traversing subgraphs
-        upstream from each flow source
+        Resolve directions of all edges within the graph with a single breadth-first
+        search upstream from all the flow sources at once, so each edge is only visited
+        once even where the subgraphs of multiple sources overlap. An edge where the
+        searches meet is directed toward the node reached first by the earliest source
 
         Parameters
         ----------
@@ -322,16 +713,31 @@ class Network:
             Set to True to print direction resolution results to console
         '''
         self.add_edges(direction='both', verbose=verbose)
+        self.update_adjacency()
 
         source_pts = self.pts[self.pts['IS_SOURCE']]
         missing_pts = []
+        source_ids = {}
 
-        for pt in source_pts.itertuples(name='StormPoint'):
-            if not self.has_StormPoint(pt):
-                missing_pts.append(pt.Index)
+        source_x = shapely.get_x(source_pts.geometry.values).tolist()
+        source_y = shapely.get_y(source_pts.geometry.values).tolist()
+        for idx, coords in zip(source_pts.index.tolist(), zip(source_x, source_y)):
+            if coords not in self._node_ids:
+                missing_pts.append(idx)
                 continue
-            self.resolve_upstream(pt)
-        
+            source_ids[self._node_ids[coords]] = None
+
+        remove = np.zeros(len(self._col_idx), dtype=bool)
+        bfs_upstream_edges(
+            self._row_ptr,
+            self._col_idx,
+            self._row_ptr_r,
+            self._col_idx_r,
+            np.array(list(source_ids), dtype=np.int64),
+            remove
+        )
+        self._remove_edges(remove)
+
         if verbose:
             if len(missing_pts) > 0:
                 print(
@@ -352,6 +758,104 @@ class Network:
                 print(f'Failed to resolve direction for {n_bidirectional/2} edges')
 
 
+    def build_adjacency(self) -> None:
+        '''
+        Number the nodes of self.G and store the graph as flat arrays, which the outlet
+        and inlet searches traverse instead of self.G. This is called by
+        resolve_directions, and again by the searches when a method of this class has
+        added edges to self.G since, see update_adjacency. Call it after editing self.G
+        directly
+
+        The searches are bound by memory access rather than computation. Each step
+        through self.G hashes a tuple of floats and follows pointers through nested
+        dicts, so the graph is also laid out as a struct of arrays: node coordinates in
+        self._xs and self._ys, and the successors of node i in
+        self._col_idx[self._row_ptr[i]:self._row_ptr[i + 1]] (compressed sparse row).
+        The predecessors are stored the same way in self._row_ptr_r and
+        self._col_idx_r. A search then reads contiguous integer arrays
+        '''
+        nodes = list(self.G.nodes())
+        n_nodes = len(nodes)
+        self._node_ids = dict(zip(nodes, range(n_nodes)))
+        node_coords = np.array(nodes, dtype=np.float64).reshape(-1, 2)
+        self._xs = np.ascontiguousarray(node_coords[:, 0])
+        self._ys = np.ascontiguousarray(node_coords[:, 1])
+
+        # Successors and predecessors are kept in the order of self.G, so searches
+        # visit nodes in the same order as the networkx equivalents. This also decides
+        # the edges that direction resolution keeps where upstream searches meet.
+        # adjacency() yields the neighbor dicts of every node without wrapping them in
+        # views, the reverse view yields the predecessors
+        csr_arrays = []
+        for graph in [self.G, self.G.reverse(copy=False)]:
+            degree = np.fromiter(
+                (len(nbrs) for _, nbrs in graph.adjacency()),
+                dtype=np.int64,
+                count=n_nodes
+            )
+            row_ptr = np.zeros(n_nodes + 1, dtype=np.int64)
+            row_ptr[1:] = np.cumsum(degree)
+            col_idx = np.fromiter(
+                (self._node_ids[v] for _, nbrs in graph.adjacency() for v in nbrs),
+                dtype=np.int64,
+                count=row_ptr[-1]
+            )
+            csr_arrays.append((row_ptr, col_idx))
+        (self._row_ptr, self._col_idx), (self._row_ptr_r, self._col_idx_r) = csr_arrays
+
+        self._n_nodes = n_nodes
+        self._flag_cycles()
+
+        # Visited mask for searches, reused between calls and all False between them
+        self._visited = np.zeros(n_nodes, dtype=bool)
+        self._outlet_cache = {}
+        self._adjacency_stale = False
+
+
+    def _flag_cycles(self) -> None:
+        '''
+        Flag the nodes of the arrays from build_adjacency that are on cycles (including
+        self loops) in self._in_cycle, outlets are only cached for nodes whose
+        downstream subgraph is acyclic
+        '''
+        n_nodes = self._n_nodes
+        adjacency = csr_matrix(
+            (np.ones(len(self._col_idx)), self._col_idx, self._row_ptr),
+            shape=(n_nodes, n_nodes)
+        )
+        _, labels = connected_components(adjacency, directed=True, connection='strong')
+        self._in_cycle = np.bincount(labels)[labels] > 1
+        edge_rows = np.repeat(np.arange(n_nodes), np.diff(self._row_ptr))
+        self._in_cycle[edge_rows[edge_rows == self._col_idx]] = True
+
+
+    def update_adjacency(self) -> None:
+        '''
+        Rebuild the arrays from build_adjacency if they have not been built yet, or if
+        a method of this class has edited self.G since they were built. Edits made to
+        self.G directly are not tracked, call build_adjacency after making them
+        '''
+        if self._adjacency_stale:
+            self.build_adjacency()
+
+
+    def node_coords(self, node_ids) -> list:
+        '''
+        Get the coordinates of nodes numbered by build_adjacency
+
+        Parameters
+        ----------
+        node_ids : np.ndarray | list
+            Integer node ids
+
+        Returns
+        -------
+        coords : list
+            List of (x, y) coordinate tuples, the names of the nodes in self.G
+        '''
+        return list(zip(self._xs[node_ids].tolist(), self._ys[node_ids].tolist()))
+
+
     def resolve_directions(
         self, method: str='from_sources', verbose: bool=False
     ) -> None:
@@ -384,9 +888,74 @@ class Network:
                 '"from_sources", "vertex_order", or "vertex_order_r".'
             )
 
+        self.update_adjacency()
         self.directions_resolved = True
 
 
+    def get_outlet_coords(self, coords: tuple) -> list:
+        '''
+        Get the coordinates of the outlets (leaves of the depth-first search tree) that
+        a node drains to. Results are cached for the start node and every node along
+        the unbranched path leading away from it, so sinks that share a downstream path
+        only traverse it once
+
+        Parameters
+        ----------
+        coords : tuple
+            Tuple of (x, y) float coordinates of a node in self.G
+
+        Returns
+        -------
+        outlet_coords : list
+            List of (x, y) coordinate tuples of the outlets, in depth-first order
+        '''
+        self.update_adjacency()
+        return self._get_outlet_coords(coords)
+
+
+    def _get_outlet_coords(self, coords: tuple) -> list:
+        '''
+        get_outlet_coords without refreshing the arrays from build_adjacency, for
+        callers that have already done so
+        '''
+        start = self._node_ids[coords]
+        row_ptr = self._row_ptr
+        col_idx = self._col_idx
+
+        # Follow the path downstream while it has no branches
+        path = []
+        on_path = set()
+        node = start
+        while node not in self._outlet_cache and row_ptr[node + 1] - row_ptr[node] == 1:
+            path.append(node)
+            on_path.add(node)
+            node = int(col_idx[row_ptr[node]])
+            if node in on_path:
+                # Cycle without any branches, cannot share results along this path
+                _, leaves = dfs_tree_leaves(row_ptr, col_idx, start, self._visited)
+                return self.node_coords(leaves)
+
+        if node in self._outlet_cache:
+            outlet_coords = self._outlet_cache[node]
+            for n in path:
+                self._outlet_cache[n] = outlet_coords
+            return outlet_coords
+
+        order, leaves = dfs_tree_leaves(row_ptr, col_idx, node, self._visited)
+        if self._in_cycle[order].any():
+            # Nodes along the path may be revisited from node, search from the start
+            if len(path) > 0:
+                _, leaves = dfs_tree_leaves(row_ptr, col_idx, start, self._visited)
+            return self.node_coords(leaves)
+
+        # Every node along the path drains to the same acyclic subgraph
+        outlet_coords = self.node_coords(leaves)
+        path.append(node)
+        for n in path:
+            self._outlet_cache[n] = outlet_coords
+        return outlet_coords
+
+
     def get_outlet(self, pt_idx: int) -> Optional[int]:
         '''
         Get Index of the outlet for a given storm_pt whose coordinates exist in the
@@ -402,16 +971,24 @@ class Network:
                 f'Cannot get outlet until graph directions are resolved'
             )
 
-        pt_x, pt_y = get_point_coords(self.pts.loc[pt_idx].geometry)
-        if (pt_x, pt_y) not in self.G:
+        self.update_adjacency()
+        return self._get_outlet(pt_idx)
+
+
+    def _get_outlet(self, pt_idx: int) -> Optional[int]:
+        '''
+        get_outlet without refreshing the arrays from build_adjacency, for callers that
+        have already done so
+        '''
+        pt_x, pt_y = get_point_coords(self.pts.geometry.loc[pt_idx])
+        if (pt_x, pt_y) not in self._node_ids:
             warnings.warn(
                 f'The point with index {pt_idx} does not have its coordinates as a '
                 'node in the graph'
             )
             return None
 
-        subG = nx.dfs_tree(self.G, (pt_x, pt_y))
-        outlet_coords = [coords for coords, deg in subG.out_degree() if deg == 0]
+        outlet_coords = self._get_outlet_coords((pt_x, pt_y))
         if len(outlet_coords) == 0:
             raise ValueError(f'Subgraph of point with index {pt_idx} has no outlet')
         elif len(outlet_coords) > 1:
@@ -420,17 +997,35 @@ class Network:
                 'only returning the first'
             )
 
-        outlet_x, outlet_y = outlet_coords[0]
-        outlet_pts = self.pts.cx[outlet_x, outlet_y] # gpd.GeoDataFrame
-        if len(outlet_pts) == 0:
+        outlet_idxs = self._coord_to_idx.get(outlet_coords[0], [])
+        if len(outlet_idxs) == 0:
             return None
-        elif len(outlet_pts) > 1:
+        elif len(outlet_idxs) > 1:
             warnings.warn(
                 f'Multiple outlet coordinates found for point with index {pt_idx}, '
                 'only returning the first'
             )
 
-        return outlet_pts.iloc[0].name
+        return outlet_idxs[0]
+
+
+    def clip_points(self, mask) -> gpd.GeoDataFrame:
+        '''
+        Get all the infrastructure points that intersect a mask geometry, using the
+        spatial index of the points built during initialization
+
+        Parameters
+        ----------
+        mask : shapely.Geometry
+            Geometry (e.g., a catchment polygon) in the same CRS as self.pts
+
+        Returns
+        -------
+        clipped_pts : gpd.GeoDataFrame
+            Subset of self.pts that intersects the mask
+        '''
+        pt_positions = self._pts_tree.query(mask, predicate='intersects')
+        return self.pts.iloc[np.sort(pt_positions)]
 
 
     def get_outlet_points(self, catchment: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
@@ -450,16 +1045,22 @@ class Network:
             GeoDataFrame containing all the points that bring flow out of the current
             catchment
         '''
+        if not self.directions_resolved:
+            raise ValueError(
+                f'Cannot get outlet points until graph directions are resolved'
+            )
+
         if catchment.crs != self.pts.crs:
             catchment = catchment.to_crs(crs=self.pts.crs)
 
-        catchment_pts = gpd.clip(self.pts, catchment)
+        catchment_pts = self.clip_points(shapely.union_all(catchment.geometry.values))
         sink_pts = catchment_pts[catchment_pts['IS_SINK']==True]
 
         indicies_to_remove = []
         sink_pt_inidicies = sink_pts.index.to_list()
+        self.update_adjacency()
         for idx in sink_pt_inidicies:
-            outlet_idx = self.get_outlet(idx)
+            outlet_idx = self._get_outlet(idx)
             if outlet_idx is not None and outlet_idx not in catchment_pts.index:
                 indicies_to_remove.append(outlet_idx)
         
@@ -490,25 +1091,62 @@ class Network:
         if catchment.crs != self.pts.crs:
             catchment = catchment.to_crs(crs=self.pts.crs)
 
-        catchment_pts = gpd.clip(self.pts, catchment)
+        catchment_geom = shapely.union_all(catchment.geometry.values)
+        shapely.prepare(catchment_geom)
+        catchment_pts = self.clip_points(catchment_geom)
         source_pts = catchment_pts[catchment_pts['IS_SOURCE']==True]
-        source_pt_geoms = source_pts.geometry.tolist()
-        source_pt_coords = [get_point_coords(geom) for geom in source_pt_geoms]
+        source_pt_coords = zip(
+            shapely.get_x(source_pts.geometry.values).tolist(),
+            shapely.get_y(source_pts.geometry.values).tolist()
+        )
 
-        contrib_sink_inidices = set()
+        # Collect every node upstream of the source points
+        self.update_adjacency()
+        source_ids = []
         for coords in source_pt_coords:
-            tree = nx.bfs_tree(self.G, coords, reverse=True)
-
-            for node in tree.nodes():
-                if catchment.contains(Point(node)).any():
-                    continue
-                
-                # Look for StormPoints at these coordinates
-                pt = self.pts.cx[node[0], node[1]]
-                if not pt.empty:
-                    pt = self.to_StormPoint(pt)
-                    contrib_sink_inidices.add(pt.Index)
-        
+            if coords not in self._node_ids:
+                warnings.warn(
+                    f'The source point at coordinates {coords} does not have its '
+                    'coordinates as a node in the graph'
+                )
+                continue
+            source_ids.append(self._node_ids[coords])
+
+        # Searches from all sources share the visited mask, each node is only
+        # expanded once no matter how many sources it drains to
+        upstream_ids = bfs_order(
+            self._row_ptr_r,
+            self._col_idx_r,
+            np.array(list(source_ids), dtype=np.int64),
+            self._visited
+        )
+        self._visited[upstream_ids] = False
+        upstream_nodes = self.node_coords(upstream_ids)
+
+        # Test all the nodes against the catchment at once
+        if len(upstream_nodes) > 0:
+            upstream_pts = shapely.points(
+                self._xs[upstream_ids], self._ys[upstream_ids]
+            )
+            inside = shapely.contains(catchment_geom, upstream_pts)
+        else:
+            inside = []
+
+        contrib_sink_inidices = set()
+        for node, node_inside in zip(upstream_nodes, inside):
+            if node_inside:
+                continue
+
+            # Look for StormPoints at these coordinates
+            pt_idxs = self._coord_to_idx.get(node, [])
+            if len(pt_idxs) > 1:
+                warnings.warn(
+                    f'Multiple points found at coordinates {node}, only keeping '
+                    'the first'
+                )
+            if len(pt_idxs) > 0:
+                contrib_sink_inidices.add(pt_idxs[0])
+
         return self.pts.loc[list(contrib_sink_inidices)]
 
 
@@ -531,7 +1169,6 @@ class Network:
         '''
         import matplotlib.pyplot as plt
         from matplotlib.collections import LineCollection
-        import numpy as np
         if add_basemap:
             import contextily as cx
 
@@ -545,43 +1182,60 @@ class Network:
                 extent = extent.to_crs(self.crs)
             envelope = extent['geometry'].envelope.iloc[0]
 
-        bidirectional_edges = []
-        directional_edges = []
-        for edge in self.G.edges():
-            if extent is not None:
-                # Exclude edges with no verticies within extent
-                if not envelope.contains(Point(edge[0][0], edge[0][1])) and \
-                    not envelope.contains(Point(edge[1][0], edge[1][1])):
-                    continue
-            if self.G.has_edge(edge[1], edge[0]):
-                bidirectional_edges.append(edge)
-            else:
-                directional_edges.append(edge)
+        self.update_adjacency()
+        edge_u = np.repeat(np.arange(self._n_nodes), np.diff(self._row_ptr))
+        edge_v = self._col_idx
+        edge_coords = np.stack([
+            np.column_stack([self._xs[edge_u], self._ys[edge_u]]),
+            np.column_stack([self._xs[edge_v], self._ys[edge_v]])
+        ], axis=1)
+        # An edge is bidirectional if its reverse is also an edge, compare the edges as
+        # single integer keys
+        edge_keys = edge_u * self._n_nodes + edge_v
+        is_bidirectional = np.isin(edge_v * self._n_nodes + edge_u, edge_keys)
+        if extent is not None:
+            # Exclude edges with no verticies within extent
+            shapely.prepare(envelope)
+            u_in_extent = shapely.contains(envelope, shapely.points(edge_coords[:, 0]))
+            v_in_extent = shapely.contains(envelope, shapely.points(edge_coords[:, 1]))
+            in_extent = u_in_extent | v_in_extent
+            edge_coords = edge_coords[in_extent]
+            is_bidirectional = is_bidirectional[in_extent]
+
+        bidirectional_edges = edge_coords[is_bidirectional]
+        directional_edges = edge_coords[~is_bidirectional]
 
         # Plot directional edges as arrows
-        for edge in directional_edges:
-            u_x, u_y = edge[0]
-            v_x, v_y = edge[1]
-            ax.arrow(
-                u_x,
-                u_y,
-                v_x - u_x,
-                v_y - u_y,
-                shape='left',
+        if len(directional_edges) > 0:
+            u_coords = directional_edges[:, 0]
+            v_coords = directional_edges[:, 1]
+            ax.quiver(
+                u_coords[:, 0],
+                u_coords[:, 1],
+                v_coords[:, 0] - u_coords[:, 0],
+                v_coords[:, 1] - u_coords[:, 1],
+                angles='xy',
+                scale_units='xy',
+                scale=1,
+                units='xy',
                 width=0.1,
-                head_width=2,
-                length_includes_head=True,
-                ec='darkblue',
-                fc='cyan',
+                headwidth=20,
+                headlength=30,
+                headaxislength=30,
+                edgecolor='darkblue',
+                facecolor='cyan',
+                linewidth=0.5,
                 zorder=1
             )
 
         # Plot bidirectional edges as segments
-        lc = LineCollection([edge for edge in bidirectional_edges], color='darkblue')
+        lc = LineCollection(bidirectional_edges, color='darkblue')
         ax.add_collection(lc)
 
         if extent is not None:
-            pts = gpd.clip(self.pts, extent['geometry'].envelope)
+            pts = self.clip_points(
+                shapely.union_all(extent['geometry'].envelope.values)
+            )
         else:
             pts = self.pts
         
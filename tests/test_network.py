@@ -1,6 +1,12 @@
+import sys
+import warnings
+
 import geopandas as gpd
 import networkx as nx
+import numpy as np
+import pandas as pd
 import pytest
+from shapely.geometry import LineString, MultiLineString, MultiPoint, Point, Polygon
 
 from stormcatchments import network
 from stormcatchments.constants import SINK_TYPES_VT, SOURCE_TYPES_VT
@@ -145,3 +151,311 @@ def test_consec_out_synth(net_synthetic):
 # TODO:
 # Add tests for other direction resolution methods
 # Add more tests for the synthetic testing data
+
+
+def test_multilinestring_segments():
+  '''
+  Ensure MultiLineString parts are segmented separately, without a segment bridging the
+  end of one part to the start of the next
+  '''
+  storm_lines = gpd.GeoDataFrame(
+    geometry=[MultiLineString([[(0, 0), (1, 0)], [(5, 5), (6, 5)]])], crs=3857
+  )
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True], 'IS_SOURCE': [False]}, geometry=[Point(0, 0)], crs=3857
+  )
+  net = network.Network(storm_lines, storm_pts)
+  assert len(net.segments) == 2
+  assert (net.segments['src_index'] == 0).all()
+  net.resolve_directions(method='vertex_order')
+  assert not net.G.has_edge((1.0, 0.0), (5.0, 5.0))
+
+
+def test_invalid_line_geometry():
+  '''Ensure line data with non-line geometry raises a ValueError'''
+  storm_lines = gpd.GeoDataFrame(
+    geometry=[Polygon([(0, 0), (1, 0), (1, 1)])], crs=3857
+  )
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True], 'IS_SOURCE': [False]}, geometry=[Point(0, 0)], crs=3857
+  )
+  with pytest.raises(ValueError):
+    network.Network(storm_lines, storm_pts)
+
+
+def test_to_StormPoint_added_column_synth(net_synthetic):
+  '''Ensure points can still be converted after a column is added to the point data'''
+  net = net_synthetic
+  net.pts['new'] = 1
+  pt = net.to_StormPoint(net.pts.loc[14])
+  assert pt.Index == 14
+  assert pt.new == 1
+  assert pt.IS_SOURCE
+  pt = net.to_StormPoint(net.pts.loc[[14]])
+  assert pt.Index == 14
+  assert pt.new == 1
+
+
+def test_get_outlet_after_graph_edit_johnson(net_johnson):
+  '''Ensure edits to the graph after resolving directions are used to find outlets'''
+  net = net_johnson
+  net.resolve_directions()
+  assert net.get_outlet(20847) == 21134
+
+  outlet_coords = network.get_point_coords(net.pts.loc[21134].geometry)
+  net.G.remove_edges_from(list(net.G.in_edges(outlet_coords)))
+  net.build_adjacency()
+  assert net.get_outlet(20847) != 21134
+
+
+def test_get_outlet_after_edge_reversal():
+  '''
+  Ensure reversing an edge, which keeps the number of nodes and edges in the graph,
+  is used to find outlets after rebuilding the adjacency arrays
+  '''
+  storm_lines = gpd.GeoDataFrame(
+    geometry=[LineString([(0, 0), (1, 0), (2, 0)])], crs=3857
+  )
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True, False, False], 'IS_SOURCE': [False, False, True]},
+    geometry=[Point(0, 0), Point(1, 0), Point(2, 0)],
+    crs=3857
+  )
+  net = network.Network(storm_lines, storm_pts)
+  net.resolve_directions(method='vertex_order')
+  assert net.get_outlet(0) == 2
+
+  net.G.remove_edge((1, 0), (2, 0))
+  net.G.add_edge((2, 0), (1, 0))
+  net.build_adjacency()
+  assert net.get_outlet(0) == 1
+
+
+def test_get_outlet_manual_edges_johnson(net_johnson):
+  '''Ensure outlets can be found when edges are added without resolve_directions'''
+  net = net_johnson
+  net.add_edges(direction='original')
+  net.directions_resolved = True
+  assert net.get_outlet(20847) == 21134
+
+
+def test_traverse_upstream_deep_chain():
+  '''
+  Ensure direction resolution upstream from a source works on a chain of nodes longer
+  than the recursion limit
+  '''
+  n_coords = sys.getrecursionlimit() + 100
+  storm_lines = gpd.GeoDataFrame(
+    geometry=[LineString([(x, 0) for x in range(n_coords)])], crs=3857
+  )
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True, False], 'IS_SOURCE': [False, True]},
+    geometry=[Point(0, 0), Point(n_coords - 1, 0)],
+    crs=3857
+  )
+  net = network.Network(storm_lines, storm_pts)
+  net.add_edges(direction='original')
+  net.add_edges(direction='reverse')
+  assert net.G.number_of_edges() == 2 * (n_coords - 1)
+
+  net.resolve_upstream(net.pts.loc[1])
+  assert net.G.number_of_edges() == n_coords - 1
+  for x in range(n_coords - 1):
+    assert net.G.has_edge((x, 0), (x + 1, 0))
+
+
+@pytest.fixture
+def net_shared_path():
+  '''
+  Two sinks draining along a shared trunk to a single outlet, with directions
+  resolved from vertex order
+  '''
+  storm_lines = gpd.GeoDataFrame(
+    geometry=[
+      LineString([(0, 10), (5, 5)]),
+      LineString([(10, 10), (5, 5)]),
+      LineString([(5, 5), (5, 0), (5, -5), (5, -10)])
+    ],
+    crs=3857
+  )
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True, True, False], 'IS_SOURCE': [False, False, True]},
+    geometry=[Point(0, 10), Point(10, 10), Point(5, -10)],
+    crs=3857
+  )
+  net = network.Network(storm_lines, storm_pts)
+  net.resolve_directions(method='vertex_order')
+  return net
+
+
+def test_get_outlet_shared_path(net_shared_path):
+  '''
+  Ensure outlets cached for the trunk of one sink are reused for a second sink
+  draining along the same trunk
+  '''
+  net = net_shared_path
+  assert net.get_outlet(0) == 2
+  trunk_ids = [net._node_ids[coords] for coords in [(5, 5), (5, 0), (5, -5)]]
+  for node_id in trunk_ids:
+    assert net._outlet_cache[node_id] == [(5, -10)]
+
+  assert net.get_outlet(1) == 2
+  assert net._outlet_cache[net._node_ids[(10, 10)]] == [(5, -10)]
+
+
+def test_get_outlet_coords_cycle(net_shared_path):
+  '''
+  Ensure outlets reached through a cycle match the leaves of a networkx depth-first
+  search tree and are not cached
+  '''
+  net = net_shared_path
+  net.G.add_edge((5, -5), (5, 5))
+  net.build_adjacency()
+  for coords in net.G.nodes:
+    dfs_tree = nx.dfs_tree(net.G, coords)
+    leaves = [n for n in dfs_tree.nodes if dfs_tree.out_degree(n) == 0]
+    assert net.get_outlet_coords(coords) == leaves
+  cycle_ids = [net._node_ids[coords] for coords in [(5, 5), (5, 0), (5, -5)]]
+  assert not any(node_id in net._outlet_cache for node_id in cycle_ids)
+
+
+def test_resolve_from_sources_meeting_subgraphs():
+  '''
+  Ensure edges between two sources are directed to the nearest source when resolving
+  from sources, and the edge where both searches meet is directed toward the source
+  that reached it first
+  '''
+  coords = [(x, 0) for x in range(7)]
+  storm_lines = gpd.GeoDataFrame(
+    geometry=[LineString(coords), LineString(coords[::-1])], crs=3857
+  )
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [False, False, True], 'IS_SOURCE': [True, True, False]},
+    geometry=[Point(0, 0), Point(6, 0), Point(3, 0)],
+    crs=3857
+  )
+  net = network.Network(storm_lines, storm_pts)
+  net.resolve_directions(method='from_sources')
+
+  expected_edges = {
+    ((1, 0), (0, 0)),
+    ((2, 0), (1, 0)),
+    ((3, 0), (2, 0)),
+    ((4, 0), (3, 0)),
+    ((4, 0), (5, 0)),
+    ((5, 0), (6, 0))
+  }
+  assert set(net.G.edges) == expected_edges
+  with warnings.catch_warnings():
+    warnings.simplefilter('error')
+    assert net.get_outlet(2) == 0
+
+
+def test_multipoint_geometry():
+  '''
+  Ensure MultiPoint geometries with multiple points raise a single warning and keep
+  only their first point
+  '''
+  storm_lines = gpd.GeoDataFrame(geometry=[LineString([(0, 0), (1, 0)])], crs=3857)
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True, False], 'IS_SOURCE': [False, True]},
+    geometry=[MultiPoint([(0, 0), (0, 5)]), MultiPoint([(1, 0)])],
+    crs=3857
+  )
+  with pytest.warns(
+    UserWarning,
+    match='1 points have MultiPoint geometry with multiple point coordinates'
+  ):
+    net = network.Network(storm_lines, storm_pts)
+  assert net.pts.geometry.loc[0] == Point(0, 0)
+  assert net.pts.geometry.loc[1] == Point(1, 0)
+
+
+def test_invalid_point_geometry():
+  '''
+  Ensure non-point geometries in the points raise a ValueError
+  '''
+  storm_lines = gpd.GeoDataFrame(geometry=[LineString([(0, 0), (1, 0)])], crs=3857)
+  storm_pts = gpd.GeoDataFrame(
+    {'IS_SINK': [True, False], 'IS_SOURCE': [False, True]},
+    geometry=[Point(0, 0), LineString([(1, 0), (2, 0)])],
+    crs=3857
+  )
+  with pytest.raises(ValueError, match='geometry must be Point or MultiPoint'):
+    network.Network(storm_lines, storm_pts)
+
+
+def test_clip_points_johnson(net_johnson):
+  '''
+  Ensure clip_points selects the same points as geopandas clip
+  '''
+  net = net_johnson
+  catchment = gpd.read_file('tests/test_data/johnson_vt/initial_catchment.shp')
+  catchment = catchment.to_crs(net.crs)
+  for buffer in [0, 50, 200]:
+    mask = catchment.buffer(buffer).union_all()
+    clipped = net.clip_points(mask)
+    expected = gpd.clip(net.pts, mask)
+    assert len(expected) > 0
+    assert sorted(clipped.index) == sorted(expected.index)
+
+
+def test_search_kernels_cycles_johnson(net_johnson):
+  '''
+  Ensure dfs_tree_leaves and bfs_order match the networkx depth-first and
+  breadth-first search trees on a graph with cycles
+  '''
+  net = net_johnson
+  net.resolve_directions(method='vertex_order')
+  edges = list(net.G.edges)
+  net.G.add_edges_from((v, u) for u, v in edges[::5])
+  net.build_adjacency()
+  assert net._in_cycle.any()
+
+  for coords, node_id in net._node_ids.items():
+    order, leaves = network.dfs_tree_leaves(
+      net._row_ptr, net._col_idx, node_id, net._visited
+    )
+    assert not net._visited.any()
+    dfs_tree = nx.dfs_tree(net.G, coords)
+    assert net.node_coords(order) == list(dfs_tree.nodes)
+    assert net.node_coords(leaves) == [
+      n for n in dfs_tree.nodes if dfs_tree.out_degree(n) == 0
+    ]
+
+    order = network.bfs_order(
+      net._row_ptr_r, net._col_idx_r, np.array([node_id]), net._visited
+    )
+    net._visited[order] = False
+    bfs_tree = nx.bfs_tree(net.G, coords, reverse=True)
+    assert net.node_coords(order) == list(bfs_tree.nodes)
+
+
+def test_resolve_from_sources_adjacency_johnson():
+  '''
+  Ensure the adjacency arrays updated while resolving directions from sources match
+  arrays rebuilt from the resolved graph, with every line also digitized in reverse
+  '''
+  storm_lines = gpd.read_file('tests/test_data/johnson_vt/storm_lines.shp')
+  reversed_lines = storm_lines.copy()
+  reversed_lines['geometry'] = storm_lines.geometry.reverse()
+  storm_lines = pd.concat([storm_lines, reversed_lines], ignore_index=True)
+  storm_pts = gpd.read_file('tests/test_data/johnson_vt/storm_pts.shp')
+  storm_pts.set_index('OBJECTID', inplace=True)
+  net = network.Network(
+    storm_lines,
+    storm_pts,
+    type_column='Type',
+    sink_types=SINK_TYPES_VT,
+    source_types=SOURCE_TYPES_VT
+  )
+  net.add_edges(direction='both')
+  n_edges = net.G.number_of_edges()
+  net.resolve_directions(method='from_sources')
+  assert net.G.number_of_edges() < n_edges
+
+  updated = [net._row_ptr, net._col_idx, net._row_ptr_r, net._col_idx_r, net._in_cycle]
+  net.build_adjacency()
+  rebuilt = [net._row_ptr, net._col_idx, net._row_ptr_r, net._col_idx_r, net._in_cycle]
+  for updated_array, rebuilt_array in zip(updated, rebuilt):
+    assert np.array_equal(updated_array, rebuilt_array)